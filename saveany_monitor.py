@@ -10,22 +10,45 @@ SaveAny-Bot Monitor v2.7.2
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
 import psutil
+import asyncio
 import threading
 import time
 import os
 import subprocess
 import sys
 import json
+import gzip
 import socket
+import selectors
 import webbrowser
 import queue
 import re
 import uuid
 from datetime import datetime, timedelta
-from collections import deque
+from collections import deque, OrderedDict
+from functools import lru_cache
+from itertools import count, islice
 from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
 from urllib.parse import parse_qs, urlparse
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    _loads = orjson.loads
+else:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    def _loads(data):
+        return json.loads(data.decode('utf-8'))
+
 # 全局变量用于 Web 服务
 monitor_data = {
     "status": "未运行",
@@ -44,101 +67,210 @@ monitor_data = {
     "sys_upload": "0 KB/s",
     "last_update": ""
 }
+_IDLE_STATUS = dict(monitor_data)  # Bot 未运行时的状态模板
+_status_back = dict(monitor_data)  # 双缓冲的后台副本，采样线程只写这一份
+
+# 每次采样通过 Process.as_dict 一次性读取的进程属性（内部已使用 oneshot 合并系统调用）
+_PROC_ATTRS = ['cpu_percent', 'memory_info', 'memory_percent', 'num_threads', 'io_counters', 'create_time']
+if psutil.WINDOWS:
+    _PROC_ATTRS.append('num_handles')
+
+# 下载任务日志解析，模块加载时编译一次
+# 任务开始/初始化/文件开始/进度四类日志合并为一个正则，一次扫描即可分类，按 lastgroup 分派
+_COMBINED_RE = re.compile(
+    r'(?P<proc>Processing task: (?P<proc_id>\w+))'
+    r'|(?P<batch>batch_file\[(?P<batch_id>\w+)\]: Starting)'
+    r'|(?P<fstart>file\[(?P<fstart_name>.+?)\]: Starting file download)'
+    r'|(?P<prog>Progress update: (?P<prog_id>.+?), (?P<prog_d>\d+)/(?P<prog_t>\d+))')
+_COMPLETE_RE = re.compile(r'file\[([^\]]+)\].*?(?:downloaded successfully|completed)')
+_ERROR_FILE_RE = re.compile(r'file\s*\[([^\]]+)\]')
+# 完成/失败/取消关键字不区分大小写，直接用正则匹配，省去 message.lower()
+_DONE_KW_RE = re.compile(r'completed', re.I)
+_ERR_KW_RE = re.compile(r'failed|error|cancell?ed', re.I)
+_CANCEL_KW_RE = re.compile(r'cancell?ed', re.I)
 
 # 全局变量
 config_path = None
 control_callback = None
-recent_logs = deque(maxlen=500)  # 保存最近500行日志用于Web显示
-download_tasks = {}  # 当前下载任务列表 {task_id: {filename, downloaded, total, progress, status, start_time}}
+recent_logs = deque(maxlen=500)  # 保存最近500行日志用于Web显示 [(seq, line), ...]
+_log_seq = 0  # 最新一行日志的序号，单调递增
+# 当前下载任务列表 {task_id: {filename, downloaded, total, progress, status, start_time}}
+# 按最近一次更新排序，超过 MAX_TASKS 时淘汰最久没有动静的任务
+download_tasks = OrderedDict()
+MAX_TASKS = 256
+LOG_BATCH_LINES = 200  # 每轮最多处理的日志行数
+CONSOLE_MAX_LINES = 5000  # 日志页面最多保留的行数
+LOG_TAIL_LINES = 200  # Web 日志单次最多推送的行数
+PROCESS_SCAN_INTERVAL = 5  # 未找到 Bot 进程时重新查找的间隔（秒）
+LONG_LINE_PREVIEW = 4096  # 超长输出行截断后保留的字节数
+TREE_BULK_ROWS = 64  # 单次刷新新增的行数达到该值（且占大多数）时整体重建任务列表
+filename_index = {}  # {filename: task_id}，按文件名 O(1) 查找任务
+pending_tasks = deque()  # 尚未关联文件名的任务 ID，按创建顺序排列
+# {task_id: 创建序号}：download_tasks 按最近更新排序，展示时按该序号排，序号不写入任务字典以免出现在 API 中
+task_created = {}
+_task_counter = count()
+PENDING_FILENAME = '等待解析...'
 
+# 已编码的 JSON 响应缓存：数据变化时编码一次，所有请求直接复用字节
+_status_lock = threading.Lock()  # 只保护 _status_cache
+# recent_logs、_log_seq 与 _logs_cache 单独加锁，编码都在锁外进行，不拖慢 UI 线程追加日志
+_logs_lock = threading.Lock()
+# 日志解析线程与 UI/HTTP 线程共享任务表，下面的任务表操作都要在持有该锁时进行
+_tasks_lock = threading.Lock()
+# 任务缓存单独加锁：等待解析线程释放 _tasks_lock 时不会拖住日志追加和状态发布
+_tasks_cache_lock = threading.Lock()
+_status_cache = {"ver": 0, "bytes": b"{}"}
+_logs_cache = {"dirty": True, "seq": 0, "bytes": b'{"lines":[],"seq":0}'}
+_tasks_cache = {"dirty": True, "bytes": b"{}"}
+_config_cache = {"key": None, "bytes": b""}
 
-class StoppableHTTPServer(HTTPServer):
-    """可停止的 HTTP 服务器，针对 Windows Server 优化"""
-    
-    allow_reuse_address = True
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._stop_event = threading.Event()
-        self.socket.settimeout(1.0)
-    
-    def serve_forever_stoppable(self):
-        """可停止的服务循环"""
-        while not self._stop_event.is_set():
-            try:
-                self.handle_request()
-            except socket.timeout:
-                continue
-            except OSError:
-                break
-            except Exception:
-                continue
-    
-    def stop(self):
-        """停止服务器"""
-        self._stop_event.set()
-        try:
-            self.socket.close()
-        except Exception:
-            pass
+# SSE 推送：各类数据的版本号，变化时唤醒 /api/events 连接
+_events_cond = threading.Condition()
+_events_ver = {"status": 0, "logs": 0, "tasks": 0}
 
 
-class MonitorHTTPHandler(BaseHTTPRequestHandler):
-    """HTTP 请求处理器"""
-    
-    protocol_version = 'HTTP/1.0'
-    timeout = 10
-    
-    def log_message(self, format, *args):
-        pass
-    
-    def handle_one_request(self):
-        try:
-            super().handle_one_request()
-        except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
-            pass
-        except socket.timeout:
-            pass
-        except Exception:
-            pass
-    
-    def do_GET(self):
-        try:
-            parsed_path = urlparse(self.path)
-            
-            if parsed_path.path == '/' or parsed_path.path == '/index.html':
-                self.send_html_page()
-            elif parsed_path.path == '/api/status':
-                self.send_json_status()
-            elif parsed_path.path == '/api/config':
-                self.send_config()
-            elif parsed_path.path == '/api/logs':
-                self.send_logs()
-            elif parsed_path.path == '/api/tasks':
-                self.send_tasks()
-            else:
-                self.send_error(404, "Not Found")
-        except Exception:
-            pass
-    
-    def do_POST(self):
-        try:
-            parsed_path = urlparse(self.path)
-            
-            if parsed_path.path == '/api/config':
-                self.save_config()
-            elif parsed_path.path == '/api/control':
-                self.handle_control()
-            elif parsed_path.path == '/api/tasks/clear':
-                self.clear_tasks()
-            else:
-                self.send_error(404, "Not Found")
-        except Exception:
-            pass
-    
-    def send_html_page(self):
-        """发送 HTML 页面"""
-        html = '''<!DOCTYPE html>
+def _notify_event(kind):
+    with _events_cond:
+        _events_ver[kind] += 1
+        _events_cond.notify_all()
+
+
+def swap_status(data):
+    """写入后台缓冲后与 monitor_data 交换引用，读者始终看到完整的一次采样"""
+    global monitor_data, _status_back
+    _status_back.update(data)
+    monitor_data, _status_back = _status_back, monitor_data
+
+
+def publish_status():
+    """监控线程写完 monitor_data 后调用，编码一次供所有 /api/status 请求复用"""
+    buf = _dumps(monitor_data)
+    with _status_lock:
+        _status_cache["bytes"] = buf
+        _status_cache["ver"] += 1
+    _notify_event("status")
+
+
+def mark_logs_dirty():
+    """recent_logs 变化后调用，下次请求时重新编码"""
+    _logs_cache["dirty"] = True
+    _notify_event("logs")
+
+
+def mark_tasks_dirty():
+    """download_tasks 变化后调用，下次请求时重新编码"""
+    _tasks_cache["dirty"] = True
+    _notify_event("tasks")
+
+
+def get_status_bytes():
+    with _status_lock:
+        return _status_cache["bytes"]
+
+
+def _append_logs(lines):
+    """追加一批日志并依次分配序号，Web 端据此只拉取新增的行；整批只加锁、通知一次"""
+    global _log_seq
+    with _logs_lock:
+        start = _log_seq + 1
+        _log_seq += len(lines)
+        recent_logs.extend(zip(range(start, _log_seq + 1), lines))
+    mark_logs_dirty()
+
+
+def get_logs_bytes(since=0, tail=None):
+    """返回 (seq, 编码后的 {"lines", "seq"})：序号大于 since 的行中最新的 tail 行"""
+    full = False
+    with _logs_lock:
+        seq = _log_seq
+        if not 0 < since <= seq:
+            # 首次请求或序号不连续（如监控程序重启）时从头返回
+            since = 0
+            if tail is None or tail >= len(recent_logs):
+                if not _logs_cache["dirty"] and _logs_cache["seq"] == seq:
+                    return seq, _logs_cache["bytes"]
+                _logs_cache["dirty"] = False
+                full = True
+        if full:
+            lines = [l for _, l in recent_logs]
+        else:
+            # 序号连续，新增行数即 seq - since，只需从尾部倒序取这么多行
+            count = seq - since if tail is None else max(0, min(tail, seq - since))
+            lines = [l for _, l in islice(reversed(recent_logs), count)]
+            lines.reverse()
+    data = _dumps({"lines": lines, "seq": seq})
+    if full:
+        with _logs_lock:
+            # 并发编码时只保留最新的一份
+            if seq >= _logs_cache["seq"]:
+                _logs_cache["seq"] = seq
+                _logs_cache["bytes"] = data
+    return seq, data
+
+
+def add_task(task_id, task):
+    """登记新任务，超过 MAX_TASKS 时淘汰最久没有更新的任务"""
+    while len(download_tasks) >= MAX_TASKS:
+        _unindex_task(*download_tasks.popitem(last=False))
+    download_tasks[task_id] = task
+    task_created[task_id] = next(_task_counter)
+    if task['filename'] and task['filename'] != PENDING_FILENAME:
+        filename_index[task['filename']] = task_id
+    else:
+        pending_tasks.append(task_id)
+
+
+def _unindex_task(task_id, task):
+    """把已移出任务表的任务从创建序号、文件名索引或等待队列中去掉"""
+    del task_created[task_id]
+    if filename_index.get(task['filename']) == task_id:
+        del filename_index[task['filename']]
+    elif not task['filename'] or task['filename'] == PENDING_FILENAME:
+        pending_tasks.remove(task_id)
+
+
+def _tasks_by_creation():
+    """按创建顺序返回 [(task_id, task)]，调用方需持有 _tasks_lock"""
+    return sorted(download_tasks.items(), key=lambda item: task_created[item[0]])
+
+
+def remove_task(task_id):
+    """移除任务并返回是否存在（自行加锁）"""
+    with _tasks_lock:
+        task = download_tasks.pop(task_id, None)
+        if task is None:
+            return False
+        _unindex_task(task_id, task)
+        return True
+
+
+def bind_pending_task(filename):
+    """把文件名关联到最早创建、仍在等待解析的任务，返回其 ID；没有则返回 None"""
+    if not pending_tasks:
+        return None
+    task_id = pending_tasks.popleft()
+    download_tasks[task_id]['filename'] = filename
+    filename_index[filename] = task_id
+    return task_id
+
+
+def get_tasks_bytes():
+    with _tasks_cache_lock:
+        if _tasks_cache["dirty"]:
+            _tasks_cache["dirty"] = False
+            with _tasks_lock:
+                # 字典按更新时间排序，展示时按创建顺序排，避免列表随进度更新来回跳动
+                # 持锁只复制快照，编码在锁外进行，尽快把任务表还给解析线程
+                tasks_list = [dict(t) for _, t in _tasks_by_creation()]
+            _tasks_cache["bytes"] = _dumps({"tasks": tasks_list, "count": len(tasks_list)})
+        return _tasks_cache["bytes"]
+
+
+publish_status()
+
+
+# Web 页面内容固定，启动时一次性编码并压缩
+_HTML_PAGE = '''<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
@@ -306,76 +438,98 @@ class MonitorHTTPHandler(BaseHTTPRequestHandler):
         async function updateStatus() {
             try {
                 const response = await fetch('/api/status');
-                const data = await response.json();
-                
-                document.getElementById('status').innerText = data.status;
-                const badge = document.getElementById('statusBadge');
-                badge.innerText = data.status;
-                badge.className = 'status-badge ' + (data.status === '运行中' ? 'status-running' : 'status-stopped');
-                
-                document.getElementById('pid').innerText = data.pid;
-                document.getElementById('uptime').innerText = data.uptime;
-                document.getElementById('cpu').innerText = data.cpu + '%';
-                document.getElementById('cpuBar').style.width = data.cpu + '%';
-                document.getElementById('memory').innerText = data.memory;
-                document.getElementById('memBar').style.width = data.memory_percent + '%';
-                document.getElementById('threads').innerText = data.threads;
-                document.getElementById('handles').innerText = data.handles;
-                document.getElementById('downloadSpeed').innerText = data.download_speed;
-                document.getElementById('uploadSpeed').innerText = data.upload_speed;
-                document.getElementById('totalDownload').innerText = data.total_download;
-                document.getElementById('totalUpload').innerText = data.total_upload;
-                document.getElementById('sysDownload').innerText = data.sys_download;
-                document.getElementById('sysUpload').innerText = data.sys_upload;
-                document.getElementById('lastUpdate').innerText = data.last_update;
+                renderStatus(await response.json());
             } catch (e) { console.error('Status update failed', e); }
         }
 
+        function renderStatus(data) {
+            document.getElementById('status').innerText = data.status;
+            const badge = document.getElementById('statusBadge');
+            badge.innerText = data.status;
+            badge.className = 'status-badge ' + (data.status === '运行中' ? 'status-running' : 'status-stopped');
+            
+            document.getElementById('pid').innerText = data.pid;
+            document.getElementById('uptime').innerText = data.uptime;
+            document.getElementById('cpu').innerText = data.cpu + '%';
+            document.getElementById('cpuBar').style.width = data.cpu + '%';
+            document.getElementById('memory').innerText = data.memory;
+            document.getElementById('memBar').style.width = data.memory_percent + '%';
+            document.getElementById('threads').innerText = data.threads;
+            document.getElementById('handles').innerText = data.handles;
+            document.getElementById('downloadSpeed').innerText = data.download_speed;
+            document.getElementById('uploadSpeed').innerText = data.upload_speed;
+            document.getElementById('totalDownload').innerText = data.total_download;
+            document.getElementById('totalUpload').innerText = data.total_upload;
+            document.getElementById('sysDownload').innerText = data.sys_download;
+            document.getElementById('sysUpload').innerText = data.sys_upload;
+            document.getElementById('lastUpdate').innerText = data.last_update;
+        }
+
         async function updateTasks() {
             try {
                 const response = await fetch('/api/tasks');
-                const data = await response.json();
-                const tbody = document.getElementById('tasksList');
-                tbody.innerHTML = '';
-                
-                if (data.tasks.length === 0) {
-                    tbody.innerHTML = '<tr><td colspan="6" style="text-align: center; color: rgba(255,255,255,0.5);">暂无活跃任务</td></tr>';
-                    return;
-                }
-                
-                data.tasks.forEach(task => {
-                    const tr = document.createElement('tr');
-                    const statusClass = task.status === '下载中' ? 'downloading' : 
-                                      task.status === '已完成' ? 'completed' :
-                                      task.status === '已取消' ? 'cancelled' : 'failed';
-                    
-                    tr.innerHTML = `
-                        <td>${task.filename || task.task_id}</td>
-                        <td>${formatBytes(task.downloaded)}</td>
-                        <td>${formatBytes(task.total)}</td>
-                        <td>
-                            <div class="task-progress"><div class="task-progress-fill" style="width: ${task.progress}%"></div></div>
-                            <span>${task.progress}%</span>
-                        </td>
-                        <td><span class="task-status ${statusClass}">${task.status}</span></td>
-                        <td>${task.start_time}</td>
-                    `;
-                    tbody.appendChild(tr);
-                });
+                renderTasks(await response.json());
             } catch (e) { console.error('Tasks update failed', e); }
         }
 
+        function renderTasks(data) {
+            const tbody = document.getElementById('tasksList');
+            tbody.innerHTML = '';
+            
+            if (data.tasks.length === 0) {
+                tbody.innerHTML = '<tr><td colspan="6" style="text-align: center; color: rgba(255,255,255,0.5);">暂无活跃任务</td></tr>';
+                return;
+            }
+            
+            data.tasks.forEach(task => {
+                const tr = document.createElement('tr');
+                const statusClass = task.status === '下载中' ? 'downloading' : 
+                                  task.status === '已完成' ? 'completed' :
+                                  task.status === '已取消' ? 'cancelled' : 'failed';
+                
+                tr.innerHTML = `
+                    <td>${task.filename || task.task_id}</td>
+                    <td>${formatBytes(task.downloaded)}</td>
+                    <td>${formatBytes(task.total)}</td>
+                    <td>
+                        <div class="task-progress"><div class="task-progress-fill" style="width: ${task.progress}%"></div></div>
+                        <span>${task.progress}%</span>
+                    </td>
+                    <td><span class="task-status ${statusClass}">${task.status}</span></td>
+                    <td>${task.start_time}</td>
+                `;
+                tbody.appendChild(tr);
+            });
+        }
+
+        let lastLogSeq = 0;
+
         async function updateLogs() {
             try {
-                const response = await fetch('/api/logs');
-                const logs = await response.json();
-                const viewer = document.getElementById('logViewer');
-                const isAtBottom = viewer.scrollHeight - viewer.scrollTop <= viewer.clientHeight + 50;
-                viewer.innerText = logs.join('\\n');
-                if (isAtBottom) viewer.scrollTop = viewer.scrollHeight;
+                const response = await fetch(`/api/logs?tail=200&since=${lastLogSeq}`);
+                renderLogs(await response.json());
             } catch (e) { console.error('Logs update failed', e); }
         }
 
+        function renderLogs(data) {
+            const viewer = document.getElementById('logViewer');
+            // 首次加载或服务端序号回退（监控程序重启）时清空重建
+            let lines = data.lines;
+            if (lastLogSeq === 0 || data.seq < lastLogSeq) viewer.textContent = '';
+            else if (data.seq <= lastLogSeq) return;
+            // 返回的是截至 data.seq 的连续行，去掉已经显示过的部分，避免并发请求重复追加
+            else lines = lines.slice(Math.max(0, lastLogSeq - (data.seq - lines.length)));
+            lastLogSeq = data.seq;
+            if (lines.length === 0) return;
+            const isAtBottom = viewer.scrollHeight - viewer.scrollTop <= viewer.clientHeight + 50;
+            // 每行一个文本节点，节点数即行数，最多保留 500 行
+            const frag = document.createDocumentFragment();
+            for (const line of lines) frag.appendChild(document.createTextNode(line + '\\n'));
+            viewer.appendChild(frag);
+            while (viewer.childNodes.length > 500) viewer.removeChild(viewer.firstChild);
+            if (isAtBottom) viewer.scrollTop = viewer.scrollHeight;
+        }
+
         function formatBytes(bytes) {
             if (!bytes || bytes === 0) return '-';
             if (bytes < 1024) return bytes + ' B';
@@ -434,68 +588,270 @@ class MonitorHTTPHandler(BaseHTTPRequestHandler):
             } catch (e) { console.error('Clear tasks failed', e); }
         }
 
-        setInterval(updateStatus, 1000);
-        setInterval(updateTasks, 1000);
-        setInterval(updateLogs, 2000);
+        // 优先使用 SSE 推送，数据变化时服务端才发送；不支持时退回轮询
+        if (window.EventSource) {
+            let events = null;
+            // 后台标签页断开推送；回到前台时重新连接，日志从上次收到的序号继续
+            const syncEvents = () => {
+                if (document.hidden) {
+                    if (events) { events.close(); events = null; }
+                } else if (!events) {
+                    events = new EventSource(`/api/events?since=${lastLogSeq}`);
+                    events.addEventListener('status', e => renderStatus(JSON.parse(e.data)));
+                    events.addEventListener('tasks', e => renderTasks(JSON.parse(e.data)));
+                    events.addEventListener('logs', e => renderLogs(JSON.parse(e.data)));
+                }
+            };
+            document.addEventListener('visibilitychange', syncEvents);
+            syncEvents();
+        } else {
+            // 上一次请求完成后再排下一次，避免网络慢时请求堆积；后台标签页不轮询
+            const poll = (fn, ms) => (async function loop() {
+                if (!document.hidden) await fn();
+                setTimeout(loop, ms);
+            })();
+            poll(updateStatus, 1000);
+            poll(updateTasks, 1000);
+            poll(updateLogs, 2000);
+            document.addEventListener('visibilitychange', () => {
+                if (!document.hidden) { updateStatus(); updateTasks(); updateLogs(); }
+            });
+        }
     </script>
 </body>
 </html>'''
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html.encode('utf-8'))
+_HTML_BYTES = _HTML_PAGE.encode('utf-8')
+_HTML_GZIP = gzip.compress(_HTML_BYTES, 9)
+
+
+# (除数, 格式)，下标由 (bit_length - 1) // 10 直接算出，无需逐级比较
+_UNIT_TABLE = ((1, '{} B'), (1 << 10, '{:.1f} KB'), (1 << 20, '{:.1f} MB'), (1 << 30, '{:.2f} GB'))
+
+
+@lru_cache(maxsize=256)
+def fmt_bytes(n):
+    if n < 1024:
+        # bit_length 不看符号，负数（计数器回退时的速度）也按字节显示，与原逻辑一致
+        return f"{n} B"
+    i = min((n.bit_length() - 1) // 10, 3)
+    divisor, fmt = _UNIT_TABLE[i]
+    return fmt.format(n / divisor)
+
+
+_last_ts = (0, '')  # (秒级时间戳, 格式化字符串)，整体替换保证线程间读到一致的值
+
+
+def _now_str():
+    """当前时间 '%Y-%m-%d %H:%M:%S'，同一秒内复用已格式化的字符串"""
+    global _last_ts
+    t = int(time.time())
+    if t != _last_ts[0]:
+        _last_ts = (t, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t)))
+    return _last_ts[1]
+
+
+def _query_int(query, name, default):
+    """从 parse_qs 结果中读取整数参数，缺失或格式错误时返回默认值"""
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[0])
+    except ValueError:
+        return default
+
+
+class StoppableHTTPServer(ThreadingMixIn, HTTPServer):
+    """可停止的多线程 HTTP 服务器，针对 Windows Server 优化"""
+    
+    allow_reuse_address = True
+    daemon_threads = True
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stop_event = threading.Event()
+        self._serving = threading.Event()
+        # 自唤醒 socket 对：stop() 写入一个字节即可立即唤醒 select
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.socket, selectors.EVENT_READ)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+    
+    def serve_forever_stoppable(self):
+        """可停止的服务循环，空闲时阻塞在 select 上不占用 CPU"""
+        self._serving.set()
+        try:
+            while not self._stop_event.is_set():
+                for key, _ in self._selector.select():
+                    if key.fileobj is self._wake_r:
+                        return
+                    self._handle_request_noblock()
+        except OSError:
+            pass
+        finally:
+            self.server_close()
+    
+    def stop(self):
+        """停止服务器"""
+        self._stop_event.set()
+        with _events_cond:
+            _events_cond.notify_all()
+        try:
+            self._wake_w.send(b'x')
+        except OSError:
+            pass
+        # 服务循环未启动时由这里释放资源，否则由循环退出时释放
+        if not self._serving.is_set():
+            self.server_close()
+    
+    def server_close(self):
+        super().server_close()
+        for closable in (self._selector, self._wake_r, self._wake_w):
+            try:
+                closable.close()
+            except Exception:
+                pass
+
+
+class MonitorHTTPHandler(BaseHTTPRequestHandler):
+    """HTTP 请求处理器"""
+    
+    protocol_version = 'HTTP/1.1'
+    timeout = 10
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
+            self.close_connection = True
+        except socket.timeout:
+            self.close_connection = True
+        except Exception:
+            self.close_connection = True
+    
+    def do_GET(self):
+        try:
+            parsed_path = urlparse(self.path)
+            
+            if parsed_path.path == '/' or parsed_path.path == '/index.html':
+                self.send_html_page()
+            elif parsed_path.path == '/api/status':
+                self.send_json_status()
+            elif parsed_path.path == '/api/config':
+                self.send_config()
+            elif parsed_path.path == '/api/logs':
+                self.send_logs()
+            elif parsed_path.path == '/api/tasks':
+                self.send_tasks()
+            elif parsed_path.path == '/api/events':
+                self.send_events()
+            else:
+                self.send_error(404, "Not Found")
+        except Exception:
+            self.close_connection = True
+    
+    def do_POST(self):
+        try:
+            parsed_path = urlparse(self.path)
+            
+            if parsed_path.path == '/api/config':
+                self.save_config()
+            elif parsed_path.path == '/api/control':
+                self.handle_control()
+            elif parsed_path.path == '/api/tasks/clear':
+                self.clear_tasks()
+            else:
+                self.send_error(404, "Not Found")
+        except Exception:
+            self.close_connection = True
+    
+    def send_bytes(self, body, ctype=b'application/json; charset=utf-8', extra_headers=b''):
+        """状态行、响应头和正文拼成一块，一次 write 发出"""
+        conn = b'close' if self.close_connection else b'keep-alive'
+        self.wfile.write(b'%s 200 OK\r\nContent-Type: %s\r\nContent-Length: %d\r\nConnection: %s\r\n%s\r\n%s' % (
+            self.protocol_version.encode(), ctype, len(body), conn, extra_headers, body))
+
+    def send_html_page(self):
+        """发送 HTML 页面"""
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            content = _HTML_GZIP
+        else:
+            content = _HTML_BYTES
+        extra = b'Cache-Control: public, max-age=3600\r\nVary: Accept-Encoding\r\n'
+        if content is _HTML_GZIP:
+            extra += b'Content-Encoding: gzip\r\n'
+        self.send_bytes(content, b'text/html; charset=utf-8', extra)
     
     def send_json_status(self):
-        global monitor_data
-        content = json.dumps(monitor_data, ensure_ascii=False).encode('utf-8')
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(content)))
-        self.send_header('Connection', 'close')
-        self.end_headers()
-        self.wfile.write(content)
+        content = get_status_bytes()
+        self.send_bytes(content)
 
     def send_logs(self):
-        global recent_logs
-        content = json.dumps(list(recent_logs), ensure_ascii=False).encode('utf-8')
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(content)))
-        self.send_header('Connection', 'close')
-        self.end_headers()
-        self.wfile.write(content)
+        query = parse_qs(urlparse(self.path).query)
+        _, content = get_logs_bytes(_query_int(query, 'since', 0), _query_int(query, 'tail', None))
+        self.send_bytes(content)
 
     def send_tasks(self):
-        global download_tasks
-        tasks_list = list(download_tasks.values())
-        result = {"tasks": tasks_list, "count": len(tasks_list)}
-        content = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        content = get_tasks_bytes()
+        self.send_bytes(content)
+
+    def send_events(self):
+        """SSE 长连接：status / logs / tasks 变化时才推送对应事件"""
         self.send_response(200)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(content)))
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
         self.send_header('Connection', 'close')
         self.end_headers()
-        self.wfile.write(content)
+        self.close_connection = True
+        self.connection.settimeout(None)
+        # 页面重新连接时用 since 指定已收到的日志序号；浏览器自动重连时带上的 Last-Event-ID 更新，优先采用
+        log_seq = _query_int(parse_qs(urlparse(self.path).query), 'since', 0)
+        try:
+            log_seq = int(self.headers.get('Last-Event-ID', log_seq))
+        except ValueError:
+            pass
+        sent = dict.fromkeys(_events_ver, -1)
+        stop_event = self.server._stop_event
+        while not stop_event.is_set():
+            with _events_cond:
+                _events_cond.wait_for(lambda: _events_ver != sent or stop_event.is_set(), timeout=15)
+                current = dict(_events_ver)
+            frames = []
+            if current["status"] != sent["status"]:
+                frames.append(b'event: status\ndata: %s\n\n' % get_status_bytes())
+            if current["logs"] != sent["logs"]:
+                log_seq, data = get_logs_bytes(log_seq, LOG_TAIL_LINES)
+                frames.append(b'event: logs\nid: %d\ndata: %s\n\n' % (log_seq, data))
+            if current["tasks"] != sent["tasks"]:
+                frames.append(b'event: tasks\ndata: %s\n\n' % get_tasks_bytes())
+            # 无变化时发送注释行保活，同时及时发现已断开的客户端
+            self.wfile.write(b''.join(frames) or b': ping\n\n')
+            sent = current
 
     def send_config(self):
         global config_path
         result = {"success": False, "content": "", "error": ""}
         try:
             if config_path and os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    result["content"] = f.read()
-                    result["success"] = True
+                # 文件未变化（路径、修改时间、大小均相同）时直接复用上次编码结果
+                st = os.stat(config_path)
+                key = (config_path, st.st_mtime_ns, st.st_size)
+                if _config_cache["key"] != key:
+                    with open(config_path, 'r', encoding='utf-8') as f:
+                        result["content"] = f.read()
+                        result["success"] = True
+                    _config_cache.update(key=key, bytes=_dumps(result))
+                self.send_bytes(_config_cache["bytes"])
+                return
             else:
                 result["error"] = "配置文件不存在"
         except Exception as e:
             result["error"] = str(e)
-        content = json.dumps(result, ensure_ascii=False).encode('utf-8')
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(content)))
-        self.send_header('Connection', 'close')
-        self.end_headers()
-        self.wfile.write(content)
+        content = _dumps(result)
+        self.send_bytes(content)
 
     def save_config(self):
         global config_path
@@ -504,7 +860,7 @@ class MonitorHTTPHandler(BaseHTTPRequestHandler):
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length > 0:
                 post_data = self.rfile.read(content_length)
-                data = json.loads(post_data.decode('utf-8'))
+                data = _loads(post_data)
                 if config_path:
                     with open(config_path, 'w', encoding='utf-8') as f:
                         f.write(data['content'])
@@ -513,13 +869,8 @@ class MonitorHTTPHandler(BaseHTTPRequestHandler):
                     result["error"] = "配置文件路径未设置"
         except Exception as e:
             result["error"] = str(e)
-        content = json.dumps(result, ensure_ascii=False).encode('utf-8')
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(content)))
-        self.send_header('Connection', 'close')
-        self.end_headers()
-        self.wfile.write(content)
+        content = _dumps(result)
+        self.send_bytes(content)
 
     def handle_control(self):
         global control_callback
@@ -528,7 +879,7 @@ class MonitorHTTPHandler(BaseHTTPRequestHandler):
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length > 0:
                 post_data = self.rfile.read(content_length)
-                data = json.loads(post_data.decode('utf-8'))
+                data = _loads(post_data)
                 action = data.get('action', '')
                 if control_callback:
                     result["message"] = control_callback(action)
@@ -537,13 +888,8 @@ class MonitorHTTPHandler(BaseHTTPRequestHandler):
                     result["message"] = "控制功能未初始化"
         except Exception as e:
             result["message"] = str(e)
-        content = json.dumps(result, ensure_ascii=False).encode('utf-8')
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(content)))
-        self.send_header('Connection', 'close')
-        self.end_headers()
-        self.wfile.write(content)
+        content = _dumps(result)
+        self.send_bytes(content)
 
     def clear_tasks(self):
         global download_tasks
@@ -551,28 +897,26 @@ class MonitorHTTPHandler(BaseHTTPRequestHandler):
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length > 0:
                 body = self.rfile.read(content_length)
-                data = json.loads(body.decode('utf-8'))
+                data = _loads(body)
                 clear_type = data.get('type', 'completed')
             else:
                 clear_type = 'completed'
             to_remove = []
-            for tid, task in download_tasks.items():
-                if clear_type == 'completed' and task.get('status') in ['已完成', '已取消', '失败']:
-                    to_remove.append(tid)
-                elif clear_type == 'all':
-                    to_remove.append(tid)
+            with _tasks_lock:
+                for tid, task in download_tasks.items():
+                    if clear_type == 'completed' and task.get('status') in ['已完成', '已取消', '失败']:
+                        to_remove.append(tid)
+                    elif clear_type == 'all':
+                        to_remove.append(tid)
             for tid in to_remove:
-                del download_tasks[tid]
+                remove_task(tid)
+            if to_remove:
+                mark_tasks_dirty()
             result = {"success": True, "cleared": len(to_remove)}
         except Exception as e:
             result = {"success": False, "error": str(e)}
-        content = json.dumps(result, ensure_ascii=False).encode('utf-8')
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(content)))
-        self.send_header('Connection', 'close')
-        self.end_headers()
-        self.wfile.write(content)
+        content = _dumps(result)
+        self.send_bytes(content)
 
 
 class SaveAnyMonitor:
@@ -586,9 +930,10 @@ class SaveAnyMonitor:
         self.target_path = ""
         self.process = None
         self.managed_process = None
+        self.bot_thread = None
+        self.bot_loop = None
         self.running = True
         self.update_interval = 1000
-        self.net_history = deque(maxlen=60)
         self.last_net_io = None
         self.last_net_time = None
         self.proc_last_io = None
@@ -596,18 +941,27 @@ class SaveAnyMonitor:
         self.web_server = None
         self.web_thread = None
         self.web_port = 8080
-        self.log_queue = queue.Queue()
+        self.log_queue = queue.SimpleQueue()
         self.log_file = None
         self.log_file_path = None
         self.capture_logs = True
+        self.tree_iids = {}  # {task_id: Treeview 行 iid}
+        self.tree_row_keys = {}  # {task_id: 上次写入该行时的原始字段}
+        self.parse_queue = queue.SimpleQueue()  # 待解析的日志批次，由解析线程消费
+        self.parse_thread = None
+        self.console_buf = deque(maxlen=CONSOLE_MAX_LINES)  # 待写入控制台的日志行
+        self.console_flush_pending = False
         
         global config_path, control_callback, recent_logs
         config_path = None
         control_callback = self.handle_web_control
         recent_logs = deque(maxlen=500)
+        mark_logs_dirty()
         
         self.create_widgets()
         self.start_monitoring()
+        self.parse_thread = threading.Thread(target=self._parse_loop, daemon=True)
+        self.parse_thread.start()
         self.process_log_queue()
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
@@ -646,18 +1000,26 @@ class SaveAnyMonitor:
         self.create_web_tab(web_frame)
 
     def create_monitor_tab(self, parent):
+        # 各项指标由变量驱动，采样结果只需更新变化了的变量
+        self.monitor_vars = {key: tk.StringVar(value=text) for key, text in (
+            ("status", "检测中..."), ("pid", "-"), ("uptime", "-"), ("cpu", "0%"), ("memory", "0 MB"),
+            ("threads", "-"), ("handles", "-"), ("download_speed", "0 KB/s"), ("upload_speed", "0 KB/s"),
+            ("total_download", "0 MB"), ("total_upload", "0 MB"), ("sys_download", "0 KB/s"), ("sys_upload", "0 KB/s"))}
+        self.cpu_percent_var = tk.DoubleVar(value=0)
+        self.mem_percent_var = tk.DoubleVar(value=0)
+        self.last_applied_status = {}
         status_frame = ttk.LabelFrame(parent, text="进程状态", padding="10")
         status_frame.pack(fill=tk.X, pady=(0, 10))
         status_row = ttk.Frame(status_frame)
         status_row.pack(fill=tk.X)
         ttk.Label(status_row, text="运行状态:").pack(side=tk.LEFT)
-        self.status_label = ttk.Label(status_row, text="检测中...", font=("Microsoft YaHei", 10, "bold"))
+        self.status_label = ttk.Label(status_row, textvariable=self.monitor_vars["status"], font=("Microsoft YaHei", 10, "bold"))
         self.status_label.pack(side=tk.LEFT, padx=(5, 20))
         ttk.Label(status_row, text="PID:").pack(side=tk.LEFT)
-        self.pid_label = ttk.Label(status_row, text="-")
+        self.pid_label = ttk.Label(status_row, textvariable=self.monitor_vars["pid"])
         self.pid_label.pack(side=tk.LEFT, padx=(5, 20))
         ttk.Label(status_row, text="运行时长:").pack(side=tk.LEFT)
-        self.uptime_label = ttk.Label(status_row, text="-")
+        self.uptime_label = ttk.Label(status_row, textvariable=self.monitor_vars["uptime"])
         self.uptime_label.pack(side=tk.LEFT)
         
         resource_frame = ttk.LabelFrame(parent, text="资源占用", padding="10")
@@ -665,24 +1027,24 @@ class SaveAnyMonitor:
         cpu_row = ttk.Frame(resource_frame)
         cpu_row.pack(fill=tk.X, pady=(0, 5))
         ttk.Label(cpu_row, text="CPU 使用率:", width=12).pack(side=tk.LEFT)
-        self.cpu_progress = ttk.Progressbar(cpu_row, length=300, mode='determinate')
+        self.cpu_progress = ttk.Progressbar(cpu_row, length=300, mode='determinate', variable=self.cpu_percent_var)
         self.cpu_progress.pack(side=tk.LEFT, padx=(5, 10))
-        self.cpu_label = ttk.Label(cpu_row, text="0%", width=8)
+        self.cpu_label = ttk.Label(cpu_row, textvariable=self.monitor_vars["cpu"], width=8)
         self.cpu_label.pack(side=tk.LEFT)
         mem_row = ttk.Frame(resource_frame)
         mem_row.pack(fill=tk.X, pady=(0, 5))
         ttk.Label(mem_row, text="内存使用:", width=12).pack(side=tk.LEFT)
-        self.mem_progress = ttk.Progressbar(mem_row, length=300, mode='determinate')
+        self.mem_progress = ttk.Progressbar(mem_row, length=300, mode='determinate', variable=self.mem_percent_var)
         self.mem_progress.pack(side=tk.LEFT, padx=(5, 10))
-        self.mem_label = ttk.Label(mem_row, text="0 MB", width=8)
+        self.mem_label = ttk.Label(mem_row, textvariable=self.monitor_vars["memory"], width=8)
         self.mem_label.pack(side=tk.LEFT)
         thread_row = ttk.Frame(resource_frame)
         thread_row.pack(fill=tk.X)
         ttk.Label(thread_row, text="线程数:").pack(side=tk.LEFT)
-        self.thread_label = ttk.Label(thread_row, text="-")
+        self.thread_label = ttk.Label(thread_row, textvariable=self.monitor_vars["threads"])
         self.thread_label.pack(side=tk.LEFT, padx=(5, 20))
         ttk.Label(thread_row, text="句柄数:").pack(side=tk.LEFT)
-        self.handle_label = ttk.Label(thread_row, text="-")
+        self.handle_label = ttk.Label(thread_row, textvariable=self.monitor_vars["handles"])
         self.handle_label.pack(side=tk.LEFT)
 
         net_frame = ttk.LabelFrame(parent, text="进程网络流量", padding="10")
@@ -690,18 +1052,18 @@ class SaveAnyMonitor:
         speed_row = ttk.Frame(net_frame)
         speed_row.pack(fill=tk.X, pady=(0, 5))
         ttk.Label(speed_row, text="下载速度:").pack(side=tk.LEFT)
-        self.download_label = ttk.Label(speed_row, text="0 KB/s", font=("Consolas", 12, "bold"), foreground="green")
+        self.download_label = ttk.Label(speed_row, textvariable=self.monitor_vars["download_speed"], font=("Consolas", 12, "bold"), foreground="green")
         self.download_label.pack(side=tk.LEFT, padx=(5, 30))
         ttk.Label(speed_row, text="上传速度:").pack(side=tk.LEFT)
-        self.upload_label = ttk.Label(speed_row, text="0 KB/s", font=("Consolas", 12, "bold"), foreground="blue")
+        self.upload_label = ttk.Label(speed_row, textvariable=self.monitor_vars["upload_speed"], font=("Consolas", 12, "bold"), foreground="blue")
         self.upload_label.pack(side=tk.LEFT, padx=(5, 0))
         total_row = ttk.Frame(net_frame)
         total_row.pack(fill=tk.X)
         ttk.Label(total_row, text="累计下载:").pack(side=tk.LEFT)
-        self.total_download_label = ttk.Label(total_row, text="0 MB")
+        self.total_download_label = ttk.Label(total_row, textvariable=self.monitor_vars["total_download"])
         self.total_download_label.pack(side=tk.LEFT, padx=(5, 30))
         ttk.Label(total_row, text="累计上传:").pack(side=tk.LEFT)
-        self.total_upload_label = ttk.Label(total_row, text="0 MB")
+        self.total_upload_label = ttk.Label(total_row, textvariable=self.monitor_vars["total_upload"])
         self.total_upload_label.pack(side=tk.LEFT)
 
         sys_net_frame = ttk.LabelFrame(parent, text="系统整体网络", padding="10")
@@ -709,10 +1071,10 @@ class SaveAnyMonitor:
         sys_speed_row = ttk.Frame(sys_net_frame)
         sys_speed_row.pack(fill=tk.X)
         ttk.Label(sys_speed_row, text="系统下载:").pack(side=tk.LEFT)
-        self.sys_download_label = ttk.Label(sys_speed_row, text="0 KB/s")
+        self.sys_download_label = ttk.Label(sys_speed_row, textvariable=self.monitor_vars["sys_download"])
         self.sys_download_label.pack(side=tk.LEFT, padx=(5, 30))
         ttk.Label(sys_speed_row, text="系统上传:").pack(side=tk.LEFT)
-        self.sys_upload_label = ttk.Label(sys_speed_row, text="0 KB/s")
+        self.sys_upload_label = ttk.Label(sys_speed_row, textvariable=self.monitor_vars["sys_upload"])
         self.sys_upload_label.pack(side=tk.LEFT)
 
         path_frame = ttk.LabelFrame(parent, text="程序路径", padding="10")
@@ -750,12 +1112,12 @@ class SaveAnyMonitor:
         self.tasks_tree.heading('progress', text='进度')
         self.tasks_tree.heading('status', text='状态')
         self.tasks_tree.heading('start_time', text='开始时间')
-        self.tasks_tree.column('filename', width=250)
-        self.tasks_tree.column('downloaded', width=80)
-        self.tasks_tree.column('total', width=80)
-        self.tasks_tree.column('progress', width=70)
-        self.tasks_tree.column('status', width=80)
-        self.tasks_tree.column('start_time', width=140)
+        self.tasks_tree.column('filename', width=250, anchor='w')  # 只有文件名列随窗口伸缩
+        self.tasks_tree.column('downloaded', width=80, stretch=False, anchor='w')
+        self.tasks_tree.column('total', width=80, stretch=False, anchor='w')
+        self.tasks_tree.column('progress', width=70, stretch=False, anchor='w')
+        self.tasks_tree.column('status', width=80, stretch=False, anchor='w')
+        self.tasks_tree.column('start_time', width=140, stretch=False, anchor='w')
         self.tasks_tree.pack(fill=tk.BOTH, expand=True)
 
     def create_config_tab(self, parent):
@@ -780,166 +1142,441 @@ class SaveAnyMonitor:
         ttk.Button(parent, text="启动 Web 服务", command=self.start_web_server).pack(pady=5)
         ttk.Button(parent, text="停止 Web 服务", command=self.stop_web_server).pack(pady=5)
 
-    def parse_download_task(self, message):
-        """核心改进：解析日志提取下载任务信息"""
-        global download_tasks
+    def _parse_loop(self):
+        """解析线程：消费日志批次更新任务表，每 50ms 最多向 UI 线程提交一次结果"""
+        while self.running:
+            try:
+                lines = self.parse_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            changed = False
+            finished = []  # 本轮进入完成/失败/取消状态的任务，由 UI 线程定时移除
+            deadline = time.monotonic() + 0.05
+            while True:
+                ts = _now_str()  # 同一批日志创建的任务共用一个开始时间
+                with _tasks_lock:
+                    for line in lines:
+                        changed |= bool(self.parse_download_task(line, finished, ts))
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    lines = self.parse_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if changed:
+                self.root.after(0, self._apply_task_diff, finished)
+
+    def _apply_task_diff(self, finished):
+        """在 UI 线程中应用解析线程提交的结果"""
+        for tid in finished:
+            self.root.after(30000, lambda t=tid: self.remove_finished_task(t))
+        self.update_tasks_ui()
+
+    def parse_download_task(self, message, finished, ts):
+        """核心改进：解析日志提取下载任务信息（由解析线程在持有 _tasks_lock 时调用）
+
+        ts 为新任务的开始时间；任务表有变化时返回 True；结束的任务 ID 追加到 finished。
+        """
+        dt, index = download_tasks, filename_index  # 局部别名，避免循环中反复查找全局变量
         try:
+            m = _COMBINED_RE.search(message)
+            kind = m.lastgroup if m else None
             # 1. 解析任务开始 (即使还没开始下载，也立即显示在列表中)
-            task_match = re.search(r'Processing task: (\w+)', message)
-            if task_match:
-                task_id = task_match.group(1)
-                if task_id not in download_tasks:
-                    download_tasks[task_id] = {
+            if kind == 'proc':
+                task_id = m.group('proc_id')
+                if task_id not in dt:
+                    add_task(task_id, {
                         'task_id': task_id,
-                        'filename': '等待解析...',
+                        'filename': PENDING_FILENAME,
                         'downloaded': 0,
                         'total': 0,
                         'progress': 0,
                         'status': '排队中',
-                        'start_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                self.update_tasks_ui()
+                        'start_time': ts
+                    })
+                    return True
                 return
 
             # 2. 解析文件下载初始化
-            batch_match = re.search(r'batch_file\[(\w+)\]: Starting', message)
-            if batch_match:
-                tid = batch_match.group(1)
-                if tid in download_tasks:
-                    download_tasks[tid]['status'] = '初始化'
-                self.update_tasks_ui()
+            if kind == 'batch':
+                tid = m.group('batch_id')
+                task = dt.get(tid)
+                if task is not None:
+                    task['status'] = '初始化'
+                    dt.move_to_end(tid)
+                    return True
                 return
 
             # 3. 捕获文件名并关联到最早的“排队中”任务
-            file_start_match = re.search(r'file\[(.+?)\]: Starting file download', message)
-            if file_start_match:
-                filename = file_start_match.group(1)
-                existing = False
-                for tid in download_tasks:
-                    if download_tasks[tid]['filename'] == filename:
-                        existing = True
-                        break
-                if not existing:
-                    bound = False
-                    for tid in download_tasks:
-                        if download_tasks[tid]['filename'] == '等待解析...' or not download_tasks[tid]['filename']:
-                            download_tasks[tid]['filename'] = filename
-                            download_tasks[tid]['status'] = '开始下载'
-                            bound = True
-                            break
-                    if not bound:
+            if kind == 'fstart':
+                filename = m.group('fstart_name')
+                if filename not in index:
+                    tid = bind_pending_task(filename)
+                    if tid is not None:
+                        dt[tid]['status'] = '开始下载'
+                        dt.move_to_end(tid)
+                    else:
                         new_id = f"auto_{uuid.uuid4().hex[:8]}"
-                        download_tasks[new_id] = {
+                        add_task(new_id, {
                             'task_id': new_id,
                             'filename': filename,
                             'downloaded': 0,
                             'total': 0,
                             'progress': 0,
                             'status': '开始下载',
-                            'start_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        }
-                self.update_tasks_ui()
+                            'start_time': ts
+                        })
+                    return True
                 return
 
             # 4. 解析进度更新
-            prog_match = re.search(r'Progress update: (.+?), (\d+)/(\d+)', message)
-            if prog_match:
-                identifier = prog_match.group(1).strip()
-                downloaded = int(prog_match.group(2))
-                total = int(prog_match.group(3))
-                progress = (downloaded / total * 100) if total > 0 else 0
-                found = False
-                if identifier in download_tasks:
-                    download_tasks[identifier]['downloaded'] = downloaded
-                    download_tasks[identifier]['total'] = total
-                    download_tasks[identifier]['progress'] = round(progress, 1)
-                    download_tasks[identifier]['status'] = '下载中'
-                    found = True
-                if not found:
-                    for tid in download_tasks:
-                        if download_tasks[tid]['filename'] == identifier:
-                            download_tasks[tid]['downloaded'] = downloaded
-                            download_tasks[tid]['total'] = total
-                            download_tasks[tid]['progress'] = round(progress, 1)
-                            download_tasks[tid]['status'] = '下载中'
-                            found = True
-                            break
-                if found:
-                    self.update_tasks_ui()
+            if kind == 'prog':
+                identifier = m.group('prog_id').strip()
+                downloaded = int(m.group('prog_d'))
+                total = int(m.group('prog_t'))
+                progress = downloaded * 100 // total if total > 0 else 0  # 整数百分比
+                tid = identifier if identifier in dt else index.get(identifier)
+                if tid is not None:
+                    task = dt[tid]
+                    task['downloaded'] = downloaded
+                    task['total'] = total
+                    dt.move_to_end(tid)
+                    # 百分比没变就不触发界面刷新，字节数留到下次刷新时一并显示
+                    if task['progress'] == progress and task['status'] == '下载中':
+                        return
+                    task['progress'] = progress
+                    task['status'] = '下载中'
+                    return True
                 return
 
             # 5. 完成/失败/取消
-            if 'downloaded successfully' in message or 'upload completed' in message or 'completed' in message.lower():
-                complete_match = re.search(r'file\[(.+?)\].*(?:downloaded successfully|completed)', message)
+            if 'downloaded successfully' in message or _DONE_KW_RE.search(message):
+                complete_match = _COMPLETE_RE.search(message)
                 if complete_match:
-                    filename = complete_match.group(1)
-                    for tid, task in list(download_tasks.items()):
-                        if task['filename'] == filename:
-                            download_tasks[tid]['status'] = '已完成'
-                            download_tasks[tid]['progress'] = 100
-                            self.root.after(30000, lambda t=tid: self.remove_finished_task(t))
-                            break
-                self.update_tasks_ui()
+                    tid = index.get(complete_match.group(1))
+                    if tid is not None:
+                        task = dt[tid]
+                        task['status'] = '已完成'
+                        task['progress'] = 100
+                        dt.move_to_end(tid)
+                        finished.append(tid)
+                        return True
                 return
-            if any(kw in message.lower() for kw in ['failed', 'error', 'canceled', 'cancelled']):
-                is_canceled = any(kw in message.lower() for kw in ['canceled', 'cancelled', 'context canceled'])
-                error_match = re.search(r'file\s*\[(.+?)\]', message)
+            if _ERR_KW_RE.search(message):
+                is_canceled = _CANCEL_KW_RE.search(message) is not None
+                error_match = 'file' in message and _ERROR_FILE_RE.search(message)
                 if error_match:
-                    filename = error_match.group(1)
-                    for tid, task in list(download_tasks.items()):
-                        if task['filename'] == filename:
-                            download_tasks[tid]['status'] = '已取消' if is_canceled else '失败'
-                            self.root.after(30000, lambda t=tid: self.remove_finished_task(t))
-                            break
-                self.update_tasks_ui()
+                    tid = index.get(error_match.group(1))
+                    if tid is not None:
+                        dt[tid]['status'] = '已取消' if is_canceled else '失败'
+                        dt.move_to_end(tid)
+                        finished.append(tid)
+                        return True
                 return
         except Exception:
             pass
 
     # 辅助方法
     def update_tasks_ui(self):
+        mark_tasks_dirty()
         try:
             if hasattr(self, 'tasks_tree'):
-                for item in self.tasks_tree.get_children():
-                    self.tasks_tree.delete(item)
-                for tid, task in download_tasks.items():
-                    self.tasks_tree.insert('', 'end', values=(
-                        task['filename'] or task['task_id'],
-                        self.format_bytes(task['downloaded']),
-                        self.format_bytes(task['total']),
-                        f"{task['progress']}%",
-                        task['status'],
-                        task['start_time']
-                    ))
-                active_count = sum(1 for t in download_tasks.values() if t['status'] in ['排队中', '下载中', '初始化', '开始下载'])
-                self.tasks_count_label.config(text=f"当前任务: {len(download_tasks)} 个 (活跃: {active_count})")
+                # 增量更新：只插入新任务、修改有变化的行、删除已移除的任务
+                iids, row_keys = self.tree_iids, self.tree_row_keys
+                # 持锁只做快照，Treeview 操作在锁外进行，避免阻塞解析线程
+                with _tasks_lock:
+                    rows = [(tid, (task['filename'], task['downloaded'], task['total'], task['progress'], task['status']),
+                             task['task_id'], task['start_time']) for tid, task in _tasks_by_creation()]
+                live = set()
+                changed = []
+                active_count = 0
+                for tid, key, task_id, start_time in rows:
+                    live.add(tid)
+                    if key[4] in ['排队中', '下载中', '初始化', '开始下载']:
+                        active_count += 1
+                    # 原始字段未变化的行直接跳过，不重新格式化
+                    if row_keys.get(tid) != key:
+                        row_keys[tid] = key
+                        changed.append((tid, self._row_values(key, task_id, start_time)))
+                removed = [t for t in iids if t not in live]
+                for tid in removed:
+                    del row_keys[tid]
+                inserts = sum(1 for tid, _ in changed if tid not in iids)
+                # 只有首次填充或大部分是新行时才整体重建；只改值的行始终走 item()
+                if inserts >= TREE_BULK_ROWS and (not iids or inserts * 2 >= len(rows)):
+                    formatted = dict(changed)
+                    self._bulk_rebuild([(tid, formatted.get(tid) or self._row_values(key, task_id, start_time))
+                                        for tid, key, task_id, start_time in rows])
+                else:
+                    for tid in removed:
+                        self.tasks_tree.delete(iids.pop(tid))
+                    for tid, values in changed:
+                        iid = iids.get(tid)
+                        if iid is None:
+                            iids[tid] = self.tasks_tree.insert('', 'end', values=values)
+                        else:
+                            self.tasks_tree.item(iid, values=values)
+                self.tasks_count_label.config(text=f"当前任务: {len(rows)} 个 (活跃: {active_count})")
         except Exception: pass
 
+    def _row_values(self, key, task_id, start_time):
+        filename, downloaded, total, progress, status = key
+        return (filename or task_id, self.format_bytes(downloaded), self.format_bytes(total),
+                f"{progress}%", status, start_time)
+
+    def _bulk_rebuild(self, rows):
+        """大量行变化时整体重建：先隐藏 Treeview，插入完毕再显示，避免每次 insert 都重绘"""
+        tree = self.tasks_tree
+        tree.pack_forget()
+        tree.delete(*tree.get_children())
+        self.tree_iids = {tid: tree.insert('', 'end', values=values) for tid, values in rows}
+        tree.pack(fill=tk.BOTH, expand=True)
+
     def format_bytes(self, b):
-        if b < 1024: return f"{b} B"
-        if b < 1048576: return f"{b/1024:.1f} KB"
-        if b < 1073741824: return f"{b/1048576:.1f} MB"
-        return f"{b/1073741824:.2f} GB"
+        return fmt_bytes(b)
+
+    def _forget_tree_row(self, tid):
+        """删除单个任务对应的 Treeview 行"""
+        iid = self.tree_iids.pop(tid, None)
+        if iid is not None:
+            self.tree_row_keys.pop(tid, None)
+            self.tasks_tree.delete(iid)
+
+    def _refresh_tasks_count(self):
+        with _tasks_lock:
+            total = len(download_tasks)
+            active_count = sum(1 for t in download_tasks.values() if t['status'] in ['排队中', '下载中', '初始化', '开始下载'])
+        self.tasks_count_label.config(text=f"当前任务: {total} 个 (活跃: {active_count})")
 
     def remove_finished_task(self, tid):
-        if tid in download_tasks:
-            del download_tasks[tid]
-            self.update_tasks_ui()
+        # 只删除这一行，不必重新比对整个列表
+        if remove_task(tid):
+            mark_tasks_dirty()
+            try:
+                self._forget_tree_row(tid)
+                self._refresh_tasks_count()
+            except Exception: pass
 
     def clear_finished_tasks(self):
-        to_remove = [tid for tid, t in download_tasks.items() if t['status'] in ['已完成', '已取消', '失败']]
-        for tid in to_remove: del download_tasks[tid]
-        self.update_tasks_ui()
+        with _tasks_lock:
+            to_remove = [tid for tid, t in download_tasks.items() if t['status'] in ['已完成', '已取消', '失败']]
+        for tid in to_remove:
+            if remove_task(tid):
+                self._forget_tree_row(tid)
+        mark_tasks_dirty()
+        self._refresh_tasks_count()
+
+    # 监控采样
+    def start_monitoring(self):
+        """启动后台采样线程，psutil 调用不占用 Tk 主循环"""
+        psutil.cpu_percent(interval=None)  # 首次调用建立基准，之后均为非阻塞
+        self.cpu_count = psutil.cpu_count() or 1
+        # 先取一次网卡汇总计数作为基准，第一轮采样即可算出速度
+        self.last_net_io = psutil.net_io_counters(pernic=False)
+        self.last_net_time = time.time()
+        self.next_process_scan = 0
+        self.sampler_thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self.sampler_thread.start()
+
+    def _sample_loop(self):
+        while self.running:
+            try:
+                self._sample_once()
+            except Exception:
+                pass
+            time.sleep(self.update_interval / 1000)
+
+    def _find_process(self):
+        for proc in psutil.process_iter(['name']):
+            if (proc.info['name'] or '').lower() == self.target_process:
+                proc.cpu_percent(interval=None)
+                return proc
+        return None
+
+    def _sample_once(self):
+        now = time.time()
+        data = dict(_IDLE_STATUS)
+        if self.process is None or not self.process.is_running():
+            self.process = None
+            self.proc_last_io = None
+            # 遍历全部进程开销较大，Bot 未运行时限制重新查找的频率
+            if now >= self.next_process_scan:
+                self.process = self._find_process()
+                self.next_process_scan = now + PROCESS_SCAN_INTERVAL
+        d = None
+        if self.process is not None:
+            try:
+                d = self.process.as_dict(attrs=_PROC_ATTRS)
+            except psutil.NoSuchProcess:
+                self.process = None
+        if d is not None:
+            data["status"] = "运行中"
+            data["pid"] = self.process.pid
+            if d['create_time']:
+                data["uptime"] = str(timedelta(seconds=int(now - d['create_time'])))
+            data["cpu"] = round((d['cpu_percent'] or 0) / self.cpu_count, 1)
+            if d['memory_info']:
+                data["memory"] = f"{d['memory_info'].rss >> 20} MB"
+            data["memory_percent"] = round(d['memory_percent'] or 0, 1)
+            data["threads"] = d['num_threads'] or "-"
+            data["handles"] = d.get('num_handles') or "-"
+            io = d['io_counters']
+            if io:
+                if self.proc_last_io:
+                    dt = max(now - self.proc_last_time, 0.001)
+                    data["download_speed"] = fmt_bytes(int((io.read_bytes - self.proc_last_io.read_bytes) / dt)) + "/s"
+                    data["upload_speed"] = fmt_bytes(int((io.write_bytes - self.proc_last_io.write_bytes) / dt)) + "/s"
+                data["total_download"] = fmt_bytes(io.read_bytes)
+                data["total_upload"] = fmt_bytes(io.write_bytes)
+                self.proc_last_io, self.proc_last_time = io, now
+        net = psutil.net_io_counters(pernic=False)
+        if self.last_net_io:
+            dt = max(now - self.last_net_time, 0.001)
+            data["sys_download"] = fmt_bytes(int((net.bytes_recv - self.last_net_io.bytes_recv) / dt)) + "/s"
+            data["sys_upload"] = fmt_bytes(int((net.bytes_sent - self.last_net_io.bytes_sent) / dt)) + "/s"
+        self.last_net_io, self.last_net_time = net, now
+        data["last_update"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        swap_status(data)
+        publish_status()
+        self.root.after_idle(self._apply_to_widgets, data)
+
+    def _apply_to_widgets(self, d):
+        """只设置发生变化的变量，未变化的指标不触发 Tk 重绘"""
+        last, self.last_applied_status = self.last_applied_status, d
+        for key, var in self.monitor_vars.items():
+            if last.get(key) != d[key]:
+                var.set(f"{d[key]}%" if key == "cpu" else d[key])
+        if last.get("cpu") != d["cpu"]:
+            self.cpu_percent_var.set(d["cpu"])
+        if last.get("memory_percent") != d["memory_percent"]:
+            self.mem_percent_var.set(d["memory_percent"])
+        if last.get("status") != d["status"]:
+            self.status_label.config(foreground="green" if d["status"] == "运行中" else "red")
+
+    # 日志处理
+    def process_log_queue(self):
+        """批量取出日志队列并处理，减少 after() 调度次数"""
+        batch = []
+        while len(batch) < LOG_BATCH_LINES:
+            try:
+                batch.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self.handle_log_batch(batch)
+        if self.running:
+            # 本轮没取完说明日志积压，尽快处理下一批
+            self.root.after(10 if len(batch) == LOG_BATCH_LINES else 100, self.process_log_queue)
+
+    def handle_log_batch(self, lines):
+        _append_logs(lines)
+        self.parse_queue.put(lines)
+        if self.log_file:
+            self.log_file.write('\n'.join(lines) + '\n')
+        self.console_buf.extend(lines)
+        if not self.console_flush_pending:
+            self.console_flush_pending = True
+            self.root.after(50, self._flush_console)
+
+    def _flush_console(self):
+        """每 50ms 把缓冲的日志一次性写入控制台，超出的旧行一次性删除"""
+        self.console_flush_pending = False
+        if not self.console_buf:
+            return
+        blob = '\n'.join(self.console_buf) + '\n'
+        self.console_buf.clear()
+        self.console_log.insert(tk.END, blob)
+        excess = int(self.console_log.index('end-1c').split('.')[0]) - 1 - CONSOLE_MAX_LINES
+        if excess > 0:
+            self.console_log.delete('1.0', f'{excess + 1}.0')
+        if self.auto_scroll_var.get():
+            self.console_log.see(tk.END)
+
+    # Bot 进程管理
+    def start_bot(self):
+        """在独立线程的 asyncio 事件循环中启动 Bot，并异步读取其输出"""
+        if not self.target_path or not os.path.exists(self.target_path):
+            messagebox.showwarning("提示", "请先选择 SaveAny-Bot 程序路径")
+            return
+        if self.bot_thread and self.bot_thread.is_alive():
+            messagebox.showinfo("提示", "Bot 已在运行")
+            return
+        self.bot_thread = threading.Thread(target=lambda: asyncio.run(self._run_bot()), daemon=True)
+        self.bot_thread.start()
+
+    async def _run_bot(self):
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                self.target_path,
+                cwd=os.path.dirname(self.target_path) or None,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=1 << 20,
+                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        except OSError as e:
+            self.log_queue.put(f"[Monitor] 启动 Bot 失败: {e}")
+            return
+        self.bot_loop = asyncio.get_running_loop()
+        self.managed_process = proc
+        try:
+            try:
+                await self._pump_output(proc.stdout)
+            except Exception as e:
+                # 读取出错也要继续等待进程退出，期间 stop_bot 仍可终止它
+                self.log_queue.put(f"[Monitor] 读取 Bot 输出失败: {e}")
+            code = await proc.wait()
+            self.log_queue.put(f"[Monitor] Bot 已退出，返回码 {code}")
+        finally:
+            self.managed_process = None
+            self.bot_loop = None
+
+    async def _pump_output(self, reader):
+        """逐行读取 Bot 输出放入日志队列，超过 limit 的单行截断显示，其余部分丢弃"""
+        skipping = False  # 正在丢弃超长行剩余的部分
+        while True:
+            try:
+                line = await reader.readuntil(b'\n')
+            except asyncio.IncompleteReadError as e:
+                if e.partial and not skipping:
+                    self.log_queue.put(e.partial.decode('utf-8', 'replace').rstrip('\r\n'))
+                return
+            except asyncio.LimitOverrunError as e:
+                chunk = await reader.read(max(e.consumed, 1))
+                if not skipping:
+                    skipping = True
+                    self.log_queue.put(chunk[:LONG_LINE_PREVIEW].decode('utf-8', 'replace') + ' ...')
+                    self.log_queue.put("[Monitor] Bot 输出了一行超过 1 MiB 的日志，已截断")
+                continue
+            if skipping:
+                skipping = False
+                continue
+            self.log_queue.put(line.decode('utf-8', 'replace').rstrip('\r\n'))
+
+    def stop_bot(self):
+        loop, proc = self.bot_loop, self.managed_process
+        if loop is None or proc is None:
+            return
+        # asyncio 的进程对象只能在其所属事件循环线程中操作
+        loop.call_soon_threadsafe(proc.terminate)
+
+    def restart_bot(self):
+        self.stop_bot()
+        self._start_bot_after_exit()
+
+    def _start_bot_after_exit(self):
+        if self.bot_thread and self.bot_thread.is_alive():
+            self.root.after(200, self._start_bot_after_exit)
+        else:
+            self.start_bot()
 
     # 其他占位方法以保证运行
-    def start_monitoring(self): pass
-    def process_log_queue(self): pass
     def on_closing(self): self.running = False; self.root.destroy()
     def browse_path(self): pass
-    def start_bot(self): pass
-    def stop_bot(self): pass
-    def restart_bot(self): pass
-    def clear_console_log(self): self.console_log.delete('1.0', tk.END)
+    def clear_console_log(self):
+        self.console_buf.clear()
+        self.console_log.delete('1.0', tk.END)
     def open_log_folder(self): pass
     def load_config_from_file(self): pass
     def save_config_and_restart(self): pass